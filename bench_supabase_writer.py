@@ -0,0 +1,191 @@
+"""Benchmark SupabaseBatchWriter against a local stand-in PostgREST endpoint.
+
+The stand-in serves ``/rest/v1/<table>`` with inserts (upserts when
+``on_conflict`` is given), paged ``GET`` listing and ``DELETE ?id=in.(...)``.
+It sleeps for a fixed round trip plus a per-row cost, rejects bodies over a
+size limit with 413, and fails a share of inserts with 503 -- half of them
+after the rows were already stored, like a response lost on the way back.
+Rows are kept in a list, so duplicates left by unsafe retries show up.
+
+    python bench_supabase_writer.py --rows 5000 --failure-rate 0.02
+    python bench_supabase_writer.py --rows 5000 --upsert
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from supabase_writer import SupabaseBatchWriter, SupabaseWriteError
+
+
+TABLE = "internships"
+KEY = "redirect_link"
+
+
+class StandInTable:
+    def __init__(self) -> None:
+        self.rows: list = []
+        self.next_id = 1
+
+    def store(self, rows: list, conflict: str | None) -> None:
+        existing = {row[conflict]: row for row in self.rows} if conflict else {}
+        for row in rows:
+            if conflict and row[conflict] in existing:
+                existing[row[conflict]].update(row)
+                continue
+            stored = {"id": self.next_id, **row}
+            self.next_id += 1
+            self.rows.append(stored)
+            if conflict:
+                existing[row[conflict]] = stored
+
+    def reset(self, records: list) -> None:
+        self.rows = []
+        self.store(records, None)
+
+    def summary(self) -> str:
+        unique = len({row[KEY] for row in self.rows})
+        return f"{len(self.rows)} rows stored, {len(self.rows) - unique} duplicates"
+
+
+def build_stand_in(args: argparse.Namespace, table: StandInTable) -> FastAPI:
+    stand_in = FastAPI()
+
+    @stand_in.post(f"/rest/v1/{TABLE}")
+    async def insert(request: Request) -> Response:
+        body = await request.body()
+        if len(body) > args.max_body:
+            return Response(status_code=413)
+        rows = json.loads(body)
+        await asyncio.sleep(args.latency + args.per_row * len(rows))
+        roll = random.random()
+        if roll < args.failure_rate / 2:
+            return Response(status_code=503)
+        table.store(rows, request.query_params.get("on_conflict"))
+        if roll < args.failure_rate:
+            return Response(status_code=503)
+        return Response(status_code=201)
+
+    @stand_in.get(f"/rest/v1/{TABLE}")
+    async def select(offset: int = 0, limit: int = 1000) -> list:
+        await asyncio.sleep(args.latency)
+        return table.rows[offset:offset + limit]
+
+    @stand_in.delete(f"/rest/v1/{TABLE}")
+    async def delete(id: str) -> Response:  # pylint: disable=redefined-builtin
+        await asyncio.sleep(args.latency)
+        if id == "neq.0":
+            table.rows = []
+        else:
+            ids = {int(row_id) for row_id in id[len("in.("):-1].split(",")}
+            table.rows = [row for row in table.rows if row["id"] not in ids]
+        return Response(status_code=204)
+
+    return stand_in
+
+
+def start_server(stand_in: FastAPI, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(stand_in, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def make_records(count: int, run: int = 0) -> list:
+    return [
+        {
+            "company": f"Company {idx % 300}",
+            "title": f"Software Engineering Intern {idx}",
+            "redirect_link": f"https://example.com/jobs/{idx}",
+            "qualifications": ["Python", "SQL", "REST APIs", "Git"],
+            "location": "Remote",
+            "duration": "6 Months",
+            "based_job": "Internship",
+            "experience": "Students in their final year " * 4,
+            "stipend": f"{15000 + run * 1000}",
+        }
+        for idx in range(count)
+    ]
+
+
+def run_sequential(base_url: str, records: list) -> tuple:
+    # mirrors the original replace_supabase_rows: clear, then fixed 50-row batches, no retries
+    start = time.perf_counter()
+    written = 0
+    with httpx.Client(timeout=30) as client:
+        client.delete(f"{base_url}/rest/v1/{TABLE}", params={"id": "neq.0"})
+        for idx in range(0, len(records), 50):
+            batch = records[idx:idx + 50]
+            response = client.post(f"{base_url}/rest/v1/{TABLE}", json=batch)
+            if response.status_code >= 300:
+                return written, time.perf_counter() - start, f"aborted on HTTP {response.status_code}"
+            written += len(batch)
+    return written, time.perf_counter() - start, "ok"
+
+
+def run_writer(base_url: str, records: list, args: argparse.Namespace):
+    writer = SupabaseBatchWriter(
+        base_url,
+        "bench-key",
+        TABLE,
+        max_in_flight=args.in_flight,
+        target_latency=args.target_latency,
+        backoff_seconds=0.05,
+        upsert_key=KEY if args.upsert else None,
+    )
+    try:
+        return asyncio.run(writer.replace(records)), "ok"
+    except SupabaseWriteError as exc:
+        return None, str(exc)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.08, help="fixed round trip (s)")
+    parser.add_argument("--per-row", type=float, default=0.0002, help="server cost per row (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--max-body", type=int, default=256_000, help="413 above this many bytes")
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--target-latency", type=float, default=0.25)
+    parser.add_argument("--upsert", action="store_true", help=f"upsert on {KEY} and prune (replace path)")
+    args = parser.parse_args()
+
+    table = StandInTable()
+    server = start_server(build_stand_in(args, table), args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    previous = make_records(args.rows, run=0)
+    records = make_records(args.rows, run=1)
+
+    table.reset(previous)
+    written, elapsed, outcome = run_sequential(base_url, records)
+    print(f"sequential x50 : {written}/{len(records)} rows | {elapsed:.2f}s | {outcome} | {table.summary()}")
+
+    table.reset(previous)
+    stats, outcome = run_writer(base_url, records, args)
+    mode = "upsert+prune" if args.upsert else "insert+delete"
+    if stats is None:
+        print(f"writer ({mode}) : {outcome} | {table.summary()}")
+    else:
+        print(
+            f"writer ({mode}) : {stats.rows}/{len(records)} rows | {stats.elapsed:.2f}s | "
+            f"{stats.batches} batches | {stats.retries} retries | {stats.splits} splits | "
+            f"{stats.pruned} pruned | final batch size {stats.final_batch_size} | {table.summary()}"
+        )
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
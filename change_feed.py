@@ -0,0 +1,238 @@
+import bisect
+import ipaddress
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List
+from urllib.parse import urlsplit
+
+import httpx
+
+
+logger = logging.getLogger("job-service.changes")
+
+ADDED = "added"
+UPDATED = "updated"
+REMOVED = "removed"
+LOCAL_HOSTNAMES = {"localhost"}
+
+
+class StaleCursorError(ValueError):
+    """The client's cursor does not belong to this log, e.g. after it was reset."""
+
+    def __init__(self, message: str, epoch: str, latest: int) -> None:
+        super().__init__(message)
+        self.epoch = epoch
+        self.latest = latest
+
+
+class ChangeFeed:
+    """Append-only log of per-run job changes keyed by ``redirect_link``.
+
+    Every entry gets the next integer cursor, so a consumer that remembers the
+    last cursor it saw can ask for everything after it. The log is a JSONL file
+    that is replayed on startup to rebuild both the entries and the snapshot of
+    the current rows that the next run is diffed against. Its first line holds
+    a random ``epoch``; a new log gets a new epoch, so a cursor kept from a
+    lost or reset log is detected even once the new log has grown past it.
+    """
+
+    def __init__(self, path: str | Path, key: str = "redirect_link") -> None:
+        self.path = Path(path)
+        self.key = key
+        self._lock = threading.Lock()
+        self._entries: List[dict] = []
+        self._cursors: List[int] = []
+        self._current: dict = {}
+        self.epoch = ""
+        self._load()
+        if not self.epoch:
+            self._start_log()
+
+    @property
+    def cursor(self) -> int:
+        return self._cursors[-1] if self._cursors else 0
+
+    def rows(self) -> List[dict]:
+        with self._lock:
+            return list(self._current.values())
+
+    def _start_log(self) -> None:
+        # (re)write the log with a fresh epoch header, keeping any replayed entries
+        self.epoch = uuid.uuid4().hex
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(json.dumps({"epoch": self.epoch}) + "\n")
+            for entry in self._entries:
+                handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as handle:
+            lines = handle.readlines()
+        offset = 0
+        for idx, line in enumerate(lines):
+            # every complete line ends in a newline; anything else is the tail
+            # of an interrupted append, even if it happens to parse
+            if not line.endswith(b"\n"):
+                logger.warning("Truncating partial last entry in %s", self.path)
+                with self.path.open("r+b") as handle:
+                    handle.truncate(offset)
+                break
+            if line.strip():
+                entry = json.loads(line)
+                if idx == 0 and "epoch" in entry:
+                    self.epoch = entry["epoch"]
+                else:
+                    self._apply(entry)
+            offset += len(line)
+        if not self.epoch and self._entries:
+            # log written before epochs existed
+            self._start_log()
+        logger.info("Replayed %s change entries up to cursor %s", len(self._entries), self.cursor)
+
+    def _apply(self, entry: dict) -> None:
+        self._entries.append(entry)
+        self._cursors.append(entry["cursor"])
+        if entry["op"] == REMOVED:
+            self._current.pop(entry["key"], None)
+        else:
+            self._current[entry["key"]] = entry["record"]
+
+    def record_run(self, records: Iterable[dict]) -> List[dict]:
+        latest = {record[self.key]: record for record in records}
+        changed_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            cursor = self.cursor
+            entries = []
+            for key, record in latest.items():
+                previous = self._current.get(key)
+                if previous == record:
+                    continue
+                cursor += 1
+                entries.append({
+                    "cursor": cursor,
+                    "op": ADDED if previous is None else UPDATED,
+                    "key": key,
+                    "record": record,
+                    "changed_at": changed_at,
+                })
+            for key in self._current.keys() - latest.keys():
+                cursor += 1
+                entries.append({
+                    "cursor": cursor,
+                    "op": REMOVED,
+                    "key": key,
+                    "record": None,
+                    "changed_at": changed_at,
+                })
+            if entries:
+                payload = "".join(
+                    json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries
+                ).encode("utf-8")
+                with self.path.open("ab") as handle:
+                    size = handle.tell()
+                    try:
+                        handle.write(payload)
+                        handle.flush()
+                    except OSError:
+                        # never leave a partial line for the next append to run into
+                        handle.truncate(size)
+                        raise
+                for entry in entries:
+                    self._apply(entry)
+        logger.info("Change feed advanced to cursor %s with %s entries", self.cursor, len(entries))
+        return entries
+
+    def since(self, cursor: int, limit: int = 500, epoch: str | None = None) -> dict:
+        """Entries after ``cursor``; any cursor but 0 must come with this log's epoch."""
+        with self._lock:
+            latest = self.cursor
+            if cursor > 0 and epoch != self.epoch:
+                raise StaleCursorError(
+                    f"Cursor {cursor} is from change log epoch {epoch!r}, not {self.epoch!r}",
+                    self.epoch,
+                    latest,
+                )
+            if cursor > latest:
+                raise StaleCursorError(
+                    f"Cursor {cursor} is ahead of the change log (latest {latest})",
+                    self.epoch,
+                    latest,
+                )
+            start = bisect.bisect_right(self._cursors, cursor)
+            changes = self._entries[start:start + limit]
+        next_cursor = changes[-1]["cursor"] if changes else max(cursor, 0)
+        return {
+            "epoch": self.epoch,
+            "cursor": next_cursor,
+            "latest_cursor": latest,
+            "has_more": next_cursor < latest,
+            "changes": changes,
+        }
+
+
+def webhook_allowed(url: str, allowed_hosts: Iterable[str] = ()) -> bool:
+    """Only loopback hosts, or hosts listed explicitly, may receive changes."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+    host = parts.hostname.lower()
+    if host in LOCAL_HOSTNAMES or host in {name.lower() for name in allowed_hosts}:
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class WebhookRegistry:
+    """Webhook URLs persisted as a JSON list so they survive restarts."""
+
+    def __init__(self, path: str | Path, allowed_hosts: Iterable[str] = ()) -> None:
+        self.path = Path(path)
+        self.allowed_hosts = [host for host in allowed_hosts if host]
+        self._lock = threading.Lock()
+        self._urls: List[str] = []
+        if self.path.exists():
+            self._urls = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def urls(self) -> List[str]:
+        with self._lock:
+            return [url for url in self._urls if webhook_allowed(url, self.allowed_hosts)]
+
+    def register(self, url: str) -> List[str]:
+        if not webhook_allowed(url, self.allowed_hosts):
+            raise ValueError(f"Webhook host not allowed: {url}")
+        with self._lock:
+            if url not in self._urls:
+                self._urls.append(url)
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(self._urls), encoding="utf-8")
+                os.replace(tmp_path, self.path)
+                logger.info("Registered change webhook %s", url)
+            return list(self._urls)
+
+
+def push_webhooks(
+    urls: Iterable[str], epoch: str, entries: List[dict], timeout: float = 10.0
+) -> None:
+    if not entries:
+        return
+    payload = {"epoch": epoch, "cursor": entries[-1]["cursor"], "changes": entries}
+    with httpx.Client(timeout=timeout) as client:
+        for url in urls:
+            try:
+                response = client.post(url, json=payload)
+                response.raise_for_status()
+                logger.info("Pushed %s changes to %s", len(entries), url)
+            except httpx.HTTPError as exc:
+                logger.warning("Webhook %s failed: %s", url, exc)
@@ -1,5 +1,9 @@
+import json
 import logging
+import os
+import shutil
 import time
+from pathlib import Path
 
 from playwright.sync_api import Playwright, TimeoutError as PlaywrightTimeout
 
@@ -23,23 +27,144 @@ CHROMIUM_ARGS = [
     "--disable-dev-shm-usage",
     "--no-sandbox",
 ]
+CONTEXT_OPTIONS = {
+    "user_agent": DESKTOP_USER_AGENT,
+    "viewport": DEFAULT_VIEWPORT,
+    "device_scale_factor": 1,
+    "is_mobile": False,
+    "has_touch": False,
+    "locale": "en-US",
+}
+# resources with a body that were not transferred came from the HTTP cache;
+# cross-origin entries without Timing-Allow-Origin report 0 for both and are skipped
+CACHE_STATS_SCRIPT = """() => {
+    let hits = 0, misses = 0;
+    for (const entry of performance.getEntriesByType("resource")) {
+        if (!entry.decodedBodySize) continue;
+        if (entry.transferSize === 0) hits++; else misses++;
+    }
+    return {hits, misses};
+}"""
+
+# per-source load metrics of the latest run, keyed by profile name
+page_metrics: dict = {}
+
+
+def browser_profile_root() -> Path | None:
+    root = os.getenv("BROWSER_PROFILE_DIR")
+    return Path(root) if root else None
+
+
+def clear_browser_profiles(source: str | None = None) -> list:
+    """Delete saved profiles (cookies, storage and HTTP cache) for one or all sources.
+
+    Raises ``OSError`` if a profile cannot be removed, e.g. while a browser holds it.
+    """
+    root = browser_profile_root()
+    if root is None or not root.exists():
+        return []
+    targets = [root / source] if source else [path for path in root.iterdir() if path.is_dir()]
+    cleared = []
+    for target in targets:
+        if target.is_dir():
+            shutil.rmtree(target)
+            cleared.append(target.name)
+    return cleared
 
 
-def _spawn_page(playwright: Playwright, *, engine: str = "chromium"):
+def _spawn_page(playwright: Playwright, *, engine: str = "chromium", profile: str | None = None):
     launcher = getattr(playwright, engine)
-    browser = launcher.launch(headless=True, args=CHROMIUM_ARGS if engine == "chromium" else [])
-    context = browser.new_context(
-        user_agent=DESKTOP_USER_AGENT,
-        viewport=DEFAULT_VIEWPORT,
-        device_scale_factor=1,
-        is_mobile=False,
-        has_touch=False,
-        locale="en-US",
-    )
+    args = CHROMIUM_ARGS if engine == "chromium" else []
+    root = browser_profile_root()
+    if profile and root is not None:
+        # a persistent context keeps cookies, storage and the disk cache between runs;
+        # it owns its browser process, so there is no separate browser handle
+        user_data_dir = root / profile / engine
+        user_data_dir.mkdir(parents=True, exist_ok=True)
+        context = launcher.launch_persistent_context(
+            str(user_data_dir), headless=True, args=args, **CONTEXT_OPTIONS
+        )
+        page = context.pages[0] if context.pages else context.new_page()
+        return None, context, page
+    browser = launcher.launch(headless=True, args=args)
+    context = browser.new_context(**CONTEXT_OPTIONS)
     page = context.new_page()
     return browser, context, page
 
 
+def _close_page(browser, context) -> None:
+    try:
+        context.close()
+    except Exception:
+        pass
+    if browser is None:
+        return
+    try:
+        browser.close()
+    except Exception:
+        pass
+
+
+def _read_previous_metrics(metrics_path: Path | None, logger: logging.Logger) -> dict | None:
+    if metrics_path is None or not metrics_path.exists():
+        return None
+    try:
+        return json.loads(metrics_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable %s: %s", metrics_path, exc)
+        return None
+
+
+def _write_metrics(metrics_path: Path, metrics: dict) -> None:
+    # write-then-rename so a crash never leaves a half-written file behind
+    tmp_path = metrics_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(metrics), encoding="utf-8")
+    os.replace(tmp_path, metrics_path)
+
+
+def _record_page_metrics(
+    profile: str, page, engine: str, elapsed: float, logger: logging.Logger, label: str
+) -> None:
+    """Best effort: a failure here is logged and never fails the page load."""
+    try:
+        _collect_page_metrics(profile, page, engine, elapsed, logger, label)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning("%s page metrics not recorded: %s", label, exc)
+
+
+def _collect_page_metrics(
+    profile: str, page, engine: str, elapsed: float, logger: logging.Logger, label: str
+) -> None:
+    try:
+        cache = page.evaluate(CACHE_STATS_SCRIPT)
+    except Exception:  # pylint: disable=broad-except
+        cache = {"hits": 0, "misses": 0}
+    total = cache["hits"] + cache["misses"]
+    root = browser_profile_root()
+    metrics_path = root / profile / "metrics.json" if root is not None else None
+    previous = page_metrics.get(profile) or _read_previous_metrics(metrics_path, logger)
+    previous_ready = previous.get("time_to_ready") if isinstance(previous, dict) else None
+    if not isinstance(previous_ready, (int, float)):
+        previous_ready = None
+    metrics = {
+        "engine": engine,
+        "persistent_profile": metrics_path is not None,
+        "time_to_ready": round(elapsed, 3),
+        "previous_time_to_ready": previous_ready,
+        "time_to_ready_saved": round(previous_ready - elapsed, 3) if previous_ready is not None else None,
+        "cache_hits": cache["hits"],
+        "cache_misses": cache["misses"],
+        "cache_hit_ratio": round(cache["hits"] / total, 3) if total else None,
+    }
+    page_metrics[profile] = metrics
+    if metrics_path is not None:
+        _write_metrics(metrics_path, metrics)
+    logger.info(
+        "%s ready in %.2fs (previous %s) | cache hits %s/%s",
+        label, elapsed, previous_ready, cache["hits"], total,
+    )
+
+
 def _get_ready_page(
     playwright: Playwright,
     url: str,
@@ -49,10 +174,12 @@ def _get_ready_page(
     *,
     timeout: int = 20000,
     configure_page=None,
+    profile: str | None = None,
 ):
     for engine in ("firefox", "chromium"):
         for attempt in range(1, MAX_LOAD_ATTEMPTS + 1):
-            browser, context, page = _spawn_page(playwright, engine=engine)
+            start = time.perf_counter()
+            browser, context, page = _spawn_page(playwright, engine=engine, profile=profile)
             if configure_page:
                 configure_page(page)
             try:
@@ -62,11 +189,6 @@ def _get_ready_page(
                 page.mouse.wheel(0, 300)
                 page.wait_for_timeout(1000)
                 page.wait_for_selector(selector, state="visible", timeout=timeout)
-                if attempt > 1 or engine != "chromium":
-                    logger.info(
-                        "%s loaded on attempt %s (%s)", label, attempt, engine
-                    )
-                return browser, context, page
             except PlaywrightTimeout as exc:
                 logger.warning(
                     "%s [%s] attempt %s/%s timed out (%s); retrying",
@@ -77,15 +199,19 @@ def _get_ready_page(
                     "%s [%s] attempt %s/%s failed: %s; retrying",
                     label, engine, attempt, MAX_LOAD_ATTEMPTS, exc,
                 )
+            else:
+                if attempt > 1 or engine != "chromium":
+                    logger.info(
+                        "%s loaded on attempt %s (%s)", label, attempt, engine
+                    )
+                # outside the try: the page is ready, metrics must not trigger a retry
+                if profile:
+                    _record_page_metrics(
+                        profile, page, engine, time.perf_counter() - start, logger, label
+                    )
+                return browser, context, page
             # clean up broken instance before next attempt
-            try:
-                context.close()
-            except Exception:
-                pass
-            try:
-                browser.close()
-            except Exception:
-                pass
+            _close_page(browser, context)
             time.sleep(RETRY_DELAY_SECONDS)
         logger.warning(
             "%s exhausted %s attempts with %s; falling back", label, MAX_LOAD_ATTEMPTS, engine
@@ -104,6 +230,7 @@ def fetch_unstop(playwright:Playwright):
         unstop_logger,
         "Unstop job cards",
         timeout=30000,
+        profile="unstop",
     )
     if page is None:
         return []
@@ -191,8 +318,7 @@ def fetch_unstop(playwright:Playwright):
         unstop_logger.info("- %s @ %s | %s", title, company_name, location)
 
     unstop_logger.info("========== UNSTOP SCRAPE END | %s jobs ==========", len(jobs))
-    context.close()
-    browser.close()
+    _close_page(browser, context)
 
     return jobs
 
@@ -208,6 +334,10 @@ def fetch_internshala(playWRight:Playwright):
 
     def configure(page):
         page.set_default_timeout(20000)
+        if browser_profile_root() is not None:
+            # Playwright disables the HTTP cache while routing is on, so with a
+            # persistent profile the blocker is skipped to keep the cache warm
+            return
         page.route(
             "**/*",
             lambda route: route.abort()
@@ -224,6 +354,7 @@ def fetch_internshala(playWRight:Playwright):
         "Internshala cards",
         timeout=15000,
         configure_page=configure,
+        profile="internshala",
     )
     if page is None:
         return []
@@ -283,8 +414,7 @@ def fetch_internshala(playWRight:Playwright):
     internshala_logger.info(
         "========== INTERNSHALA SCRAPE END | %s jobs ==========", len(jobs)
     )
-    context.close()
-    browser.close()
+    _close_page(browser, context)
     return jobs
 
 def fetch_naukri(playWirght:Playwright):
@@ -297,6 +427,7 @@ def fetch_naukri(playWirght:Playwright):
         naukri_logger,
         "Naukri listings",
         timeout=20000,
+        profile="naukri",
     )
     if page is None:
         return []
@@ -367,8 +498,7 @@ def fetch_naukri(playWirght:Playwright):
         )
 
     naukri_logger.info("========== NAUKRI SCRAPE END | %s jobs =========", len(jobs))
-    context.close()
-    browser.close()
+    _close_page(browser, context)
     return jobs
 
 
@@ -383,6 +513,7 @@ def fetch_glassdoor(playwright: Playwright):
         glassdoor_logger,
         "Glassdoor listings",
         timeout=20000,
+        profile="glassdoor",
     )
     if page is None:
         return []
@@ -446,7 +577,6 @@ def fetch_glassdoor(playwright: Playwright):
             company,
             location,
         )
-    context.close()
-    browser.close()
+    _close_page(browser, context)
     glassdoor_logger.info("========== GLASSDOOR SCRAPE END | %s jobs =========", len(jobs))
     return jobs
@@ -0,0 +1,10 @@
+-- Needed before setting SUPABASE_UPSERT_KEY=redirect_link: upserts resolve
+-- conflicts on this column, and replace() prunes rows by it.
+-- Drop duplicate links first, keeping the newest row for each.
+delete from internships a
+using internships b
+where a.redirect_link = b.redirect_link
+  and a.id < b.id;
+
+create unique index if not exists internships_redirect_link_key
+    on internships (redirect_link);
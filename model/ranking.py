@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+
+class SkillQuery(BaseModel):
+    skills: list[str]
+    top_k: int = Field(10, ge=1, le=100)
+
+class BatchSkillQuery(BaseModel):
+    profiles: list[list[str]] = Field(..., max_length=1000)
+    top_k: int = Field(10, ge=1, le=100)
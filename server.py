@@ -2,23 +2,32 @@ import asyncio
 import contextlib
 import logging
 import os
+import secrets
 import time
 from datetime import datetime, timezone
-from typing import Any, Callable, Iterable, List, Tuple
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from playwright.sync_api import sync_playwright
 from supabase import Client, create_client
 
+from change_feed import ChangeFeed, StaleCursorError, WebhookRegistry, push_webhooks
 from fetch_jobs import (
+    clear_browser_profiles,
     fetch_glassdoor,
     fetch_internshala,
     fetch_naukri,
     fetch_unstop,
+    page_metrics,
 )
 from model.job import Job
+from model.ranking import BatchSkillQuery, SkillQuery
+from skill_index import SkillIndex
+from snapshots import Snapshot, build_snapshot, snapshot_response
+from supabase_writer import SupabaseBatchWriter
 
 load_dotenv()
 
@@ -33,6 +42,20 @@ SCRAPE_INTERVAL_SECONDS = int(os.getenv("SCRAPE_INTERVAL_SECONDS", str(60 * 60 *
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_TABLE = os.getenv("SUPABASE_TABLE", "internships")
+SUPABASE_MAX_IN_FLIGHT = int(os.getenv("SUPABASE_MAX_IN_FLIGHT", "4"))
+SUPABASE_BATCH_SIZE = int(os.getenv("SUPABASE_BATCH_SIZE", "50"))
+# opt-in: needs a unique index on this column (see migrations/)
+SUPABASE_UPSERT_KEY = os.getenv("SUPABASE_UPSERT_KEY", "")
+CHANGE_FEED_PATH = os.getenv("CHANGE_FEED_PATH", "data/changes.jsonl")
+CHANGE_WEBHOOK_URLS = [
+    url.strip() for url in os.getenv("CHANGE_WEBHOOK_URLS", "").split(",") if url.strip()
+]
+# webhooks may only target loopback hosts unless a host is listed here
+CHANGE_WEBHOOK_ALLOWED_HOSTS = [
+    host.strip() for host in os.getenv("CHANGE_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+]
+# registering over HTTP is disabled unless this token is set
+CHANGE_WEBHOOK_TOKEN = os.getenv("CHANGE_WEBHOOK_TOKEN", "")
 
 JOB_SOURCES: Tuple[Tuple[str, Scraper], ...] = (
     ("unstop", fetch_unstop),
@@ -43,6 +66,10 @@ JOB_SOURCES: Tuple[Tuple[str, Scraper], ...] = (
 
 app = FastAPI(title="Internlee Scraper Service")
 supabase_client: Client | None = None
+change_feed: ChangeFeed | None = None
+webhooks: WebhookRegistry | None = None
+# keeps background webhook pushes referenced until they finish
+webhook_tasks: set = set()
 scrape_lock = asyncio.Lock()
 status_snapshot = {
     "last_run_started": None,
@@ -50,7 +77,30 @@ status_snapshot = {
     "last_status": "never",
     "last_error": None,
     "last_count": 0,
+    "page_metrics": {},
 }
+# serialized once per change and served from bytes on every poll
+status_response: Snapshot = build_snapshot(status_snapshot)
+jobs_response: Snapshot = build_snapshot([])
+skill_index: SkillIndex = SkillIndex([])
+
+
+def publish_status() -> None:
+    global status_response  # pylint: disable=global-statement
+    status_response = build_snapshot(status_snapshot)
+
+
+def publish_jobs(records: List[dict]) -> None:
+    global jobs_response, skill_index  # pylint: disable=global-statement
+    jobs_response = build_snapshot(records)
+    skill_index = SkillIndex(records)
+
+
+def ranked_jobs(index: SkillIndex, profiles: List[List[str]], top_k: int) -> List[List[dict]]:
+    return [
+        [{"score": round(score, 4), "job": index.records[row]} for row, score in matches]
+        for matches in index.rank(profiles, top_k)
+    ]
 
 
 def init_supabase() -> Client:
@@ -59,17 +109,6 @@ def init_supabase() -> Client:
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-def chunked(items: Iterable[dict], size: int = 100) -> Iterable[List[dict]]:
-    chunk: List[dict] = []
-    for item in items:
-        chunk.append(item)
-        if len(chunk) == size:
-            yield chunk
-            chunk = []
-    if chunk:
-        yield chunk
-
-
 def job_to_record(job: Job) -> dict:
     return {
         "company": job.company,
@@ -84,18 +123,24 @@ def job_to_record(job: Job) -> dict:
     }
 
 
-def replace_supabase_rows(client: Client, records: List[dict]) -> None:
-    logger.info("Clearing existing rows in %s", SUPABASE_TABLE)
-    client.table(SUPABASE_TABLE).delete().neq("id", 0).execute()
-    if not records:
-        logger.info("No new jobs to insert after clearing table")
-        return
-    for batch in chunked(records, size=50):
-        client.table(SUPABASE_TABLE).insert(batch).execute()
-        logger.info("Inserted %s records", len(batch))
+def replace_supabase_rows(records: List[dict]) -> int:
+    writer = SupabaseBatchWriter(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        SUPABASE_TABLE,
+        max_in_flight=SUPABASE_MAX_IN_FLIGHT,
+        batch_size=SUPABASE_BATCH_SIZE,
+        upsert_key=SUPABASE_UPSERT_KEY,
+    )
+    logger.info("Replacing rows in %s (%s)", SUPABASE_TABLE, "upsert" if SUPABASE_UPSERT_KEY else "insert")
+    # runs inside asyncio.to_thread, so there is no loop in this thread yet
+    stats = asyncio.run(writer.replace(records))
+    if stats.duplicates:
+        logger.warning("Dropped %s jobs sharing a %s", stats.duplicates, SUPABASE_UPSERT_KEY)
+    return stats.rows
 
 
-def run_full_scrape(triggered_by: str) -> int:
+def run_full_scrape(triggered_by: str) -> Tuple[int, List[dict]]:
     logger.info("Starting scrape run triggered by %s", triggered_by)
     total_jobs: List[Job] = []
     with sync_playwright() as playwright:
@@ -112,9 +157,22 @@ def run_full_scrape(triggered_by: str) -> int:
                 raise
     if supabase_client is None:
         raise RuntimeError("Supabase client is not initialized")
-    replace_supabase_rows(supabase_client, [job_to_record(job) for job in total_jobs])
-    logger.info("Scrape run finished. Total jobs: %s", len(total_jobs))
-    return len(total_jobs)
+    records = [job_to_record(job) for job in total_jobs]
+    written = replace_supabase_rows(records)
+    publish_jobs(records)
+    changes = change_feed.record_run(records) if change_feed is not None else []
+    logger.info("Scrape run finished. Scraped %s jobs, wrote %s rows", len(total_jobs), written)
+    return written, changes
+
+
+def schedule_webhooks(changes: List[dict]) -> None:
+    if not changes or webhooks is None or change_feed is None:
+        return
+    task = asyncio.create_task(
+        asyncio.to_thread(push_webhooks, webhooks.urls(), change_feed.epoch, changes)
+    )
+    webhook_tasks.add(task)
+    task.add_done_callback(webhook_tasks.discard)
 
 
 async def trigger_scrape(triggered_by: str) -> JSONResponse:
@@ -124,18 +182,24 @@ async def trigger_scrape(triggered_by: str) -> JSONResponse:
         status_snapshot["last_run_started"] = datetime.now(timezone.utc).isoformat()
         status_snapshot["last_status"] = "running"
         status_snapshot["last_error"] = None
+        publish_status()
         try:
-            job_count = await asyncio.to_thread(run_full_scrape, triggered_by)
+            job_count, changes = await asyncio.to_thread(run_full_scrape, triggered_by)
         except Exception as exc:  # pylint: disable=broad-except
             status_snapshot["last_status"] = "error"
             status_snapshot["last_error"] = str(exc)
             status_snapshot["last_run_finished"] = datetime.now(timezone.utc).isoformat()
+            publish_status()
             logger.error("Scrape run crashed: %s", exc)
             raise
         status_snapshot["last_status"] = "ok"
         status_snapshot["last_run_finished"] = datetime.now(timezone.utc).isoformat()
         status_snapshot["last_count"] = job_count
-        return JSONResponse({"status": "ok", "count": job_count})
+        status_snapshot["page_metrics"] = dict(page_metrics)
+        publish_status()
+    # pushed after the lock is released, so a slow consumer never holds up a run
+    schedule_webhooks(changes)
+    return JSONResponse({"status": "ok", "count": job_count})
 
 
 async def scheduler_loop() -> None:
@@ -152,9 +216,19 @@ async def scheduler_loop() -> None:
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    global supabase_client  # pylint: disable=global-statement
+    global supabase_client, change_feed, webhooks  # pylint: disable=global-statement
     supabase_client = init_supabase()
     logger.info("Supabase client initialized")
+    change_feed = ChangeFeed(CHANGE_FEED_PATH)
+    webhooks = WebhookRegistry(
+        Path(CHANGE_FEED_PATH).with_name("webhooks.json"), CHANGE_WEBHOOK_ALLOWED_HOSTS
+    )
+    for url in CHANGE_WEBHOOK_URLS:
+        try:
+            webhooks.register(url)
+        except ValueError as exc:
+            logger.warning("Ignoring CHANGE_WEBHOOK_URLS entry: %s", exc)
+    publish_jobs(change_feed.rows())
     app.state.scheduler_task = asyncio.create_task(scheduler_loop())
     logger.info(
         "Scheduler started with %s second interval",
@@ -182,10 +256,78 @@ async def health() -> dict:
 
 
 @app.get("/jobs/last-run")
-async def last_run() -> dict:
-    return status_snapshot
+async def last_run(request: Request) -> Response:
+    return snapshot_response(request, status_response)
+
+
+@app.get("/jobs")
+async def list_jobs(request: Request) -> Response:
+    return snapshot_response(request, jobs_response)
 
 
 @app.post("/jobs/refresh")
 async def manual_refresh() -> JSONResponse:
     return await trigger_scrape("manual")
+
+
+@app.get("/jobs/changes")
+async def job_changes(
+    since: int = Query(0, ge=0),
+    epoch: str | None = None,
+    limit: int = Query(500, ge=1, le=5000),
+) -> dict:
+    if change_feed is None:
+        raise HTTPException(status_code=503, detail="Change feed is not initialized")
+    try:
+        return change_feed.since(since, limit, epoch)
+    except StaleCursorError as exc:
+        # the log was reset or lost; the client must re-sync from cursor 0
+        raise HTTPException(
+            status_code=410,
+            detail={
+                "message": str(exc),
+                "epoch": exc.epoch,
+                "latest_cursor": exc.latest,
+                "resync_from": 0,
+            },
+        ) from exc
+
+
+@app.post("/jobs/changes/webhooks")
+async def register_webhook(url: str, x_webhook_token: str = Header("")) -> dict:
+    if not CHANGE_WEBHOOK_TOKEN:
+        raise HTTPException(status_code=403, detail="Webhook registration is disabled")
+    if not secrets.compare_digest(x_webhook_token, CHANGE_WEBHOOK_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+    if webhooks is None:
+        raise HTTPException(status_code=503, detail="Change feed is not initialized")
+    try:
+        return {"webhooks": webhooks.register(url)}
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+@app.post("/jobs/rank")
+async def rank_jobs(query: SkillQuery) -> dict:
+    return {"results": ranked_jobs(skill_index, [query.skills], query.top_k)[0]}
+
+
+@app.post("/jobs/rank/batch")
+async def rank_jobs_batch(query: BatchSkillQuery) -> dict:
+    results = await asyncio.to_thread(ranked_jobs, skill_index, query.profiles, query.top_k)
+    return {"results": results}
+
+
+@app.delete("/browser-profiles")
+async def invalidate_browser_profiles(source: str | None = None) -> dict:
+    if source is not None and source not in {name for name, _ in JOB_SOURCES}:
+        raise HTTPException(status_code=404, detail=f"Unknown source {source}")
+    if scrape_lock.locked():
+        raise HTTPException(status_code=409, detail="Scraper already running")
+    try:
+        cleared = clear_browser_profiles(source)
+    except OSError as exc:
+        logger.error("Clearing browser profiles failed: %s", exc)
+        raise HTTPException(status_code=500, detail=f"Could not clear browser profiles: {exc}") from exc
+    logger.info("Cleared browser profiles: %s", cleared or "none")
+    return {"cleared": cleared}
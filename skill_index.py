@@ -0,0 +1,111 @@
+import logging
+import re
+import time
+from typing import Iterable, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+
+logger = logging.getLogger("job-service.ranking")
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+# memory allowed for one chunk's dense float32 scores plus its int64 argpartition
+SCORE_BUDGET_BYTES = 32 * 1024 * 1024
+SCORE_BYTES_PER_CELL = 4 + 8
+
+
+def skill_terms(text: str) -> List[str]:
+    """Word tokens of a skill plus the whole phrase for multi-word skills."""
+    words = [word.rstrip(".") for word in TOKEN_RE.findall(text.lower())]
+    words = [word for word in words if word]
+    if len(words) > 1:
+        return words + [" ".join(words)]
+    return words
+
+
+class SkillIndex:
+    """TF-IDF matrix over each job's qualifications and title tokens.
+
+    Rows are L2-normalized, so ranking a batch of profiles is one sparse
+    product against the transposed matrix followed by a row-wise
+    ``argpartition`` for the top K.
+    """
+
+    def __init__(self, records: Sequence[dict]) -> None:
+        start = time.perf_counter()
+        self.records = list(records)
+        self.vocabulary: dict = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        for idx, record in enumerate(self.records):
+            terms = skill_terms(record.get("title") or "")
+            for qualification in record.get("qualifications") or []:
+                terms.extend(skill_terms(qualification))
+            for term in terms:
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                rows.append(idx)
+
+        shape = (len(self.records), len(self.vocabulary))
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape
+        )
+        counts.sum_duplicates()
+        doc_freq = np.bincount(counts.indices, minlength=shape[1])
+        self.idf = (np.log((1 + shape[0]) / (1 + doc_freq)) + 1).astype(np.float32)
+        counts.data = 1 + np.log(counts.data)
+        self._matrix_t = self._normalize(counts @ sparse.diags(self.idf)).T.tocsr()
+        logger.info(
+            "Skill index built | %s jobs | %s terms | %.3fs",
+            shape[0], shape[1], time.perf_counter() - start,
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _normalize(matrix: sparse.spmatrix) -> sparse.csr_matrix:
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+    def _query_matrix(self, profiles: Sequence[Iterable[str]]) -> sparse.csr_matrix:
+        rows: List[int] = []
+        cols: List[int] = []
+        for idx, skills in enumerate(profiles):
+            terms = {term for skill in skills for term in skill_terms(skill)}
+            for term in terms:
+                col = self.vocabulary.get(term)
+                if col is not None:
+                    rows.append(idx)
+                    cols.append(col)
+        weights = self.idf[np.asarray(cols, dtype=np.int64)]
+        matrix = sparse.csr_matrix(
+            (weights, (rows, cols)), shape=(len(profiles), len(self.vocabulary))
+        )
+        return self._normalize(matrix)
+
+    def rank(self, profiles: Sequence[Iterable[str]], top_k: int = 10) -> List[List[tuple]]:
+        """Return ``(record_index, score)`` pairs, best first, for every profile."""
+        if not profiles:
+            return []
+        if not self.records or not self.vocabulary:
+            return [[] for _ in profiles]
+        k = min(top_k, len(self.records))
+        query = self._query_matrix(profiles)
+        chunk = max(1, SCORE_BUDGET_BYTES // (SCORE_BYTES_PER_CELL * len(self.records)))
+        results: List[List[tuple]] = []
+        for chunk_start in range(0, query.shape[0], chunk):
+            scores = (query[chunk_start:chunk_start + chunk] @ self._matrix_t).toarray()
+            # negate in place so the best scores partition to the front without a copy;
+            # partitioning at -k instead is far slower on these mostly-zero rows
+            np.negative(scores, out=scores)
+            top = np.argpartition(scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = -np.take_along_axis(top_scores, order, axis=1)
+            for indices, values in zip(top, top_scores):
+                keep = values > 0
+                results.append(list(zip(indices[keep].tolist(), values[keep].tolist())))
+        return results
@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A response body serialized and compressed once, served as-is."""
+
+    identity: bytes
+    gzip: bytes
+    br: bytes | None
+    digest: str
+
+    def etag(self, encoding: str | None = None) -> str:
+        # each encoding is a different representation, so it gets its own tag
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def build_snapshot(payload: Any) -> Snapshot:
+    identity = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return Snapshot(
+        identity=identity,
+        gzip=gzip.compress(identity, compresslevel=9, mtime=0),
+        br=brotli.compress(identity, quality=11) if brotli else None,
+        digest=hashlib.sha256(identity).hexdigest()[:32],
+    )
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"; the tag must
+    # be the one for the representation this request would get
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _parse_accept_encoding(header: str) -> tuple:
+    """Split Accept-Encoding into accepted and explicitly refused (q=0) codings."""
+    accepted, refused = set(), set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0
+            if quality <= 0:
+                refused.add(coding)
+                continue
+        accepted.add(coding)
+    return accepted, refused
+
+
+def _select_encoding(header: str, snapshot: Snapshot) -> str | None:
+    accepted, refused = _parse_accept_encoding(header)
+
+    def _ok(coding: str) -> bool:
+        return coding in accepted or ("*" in accepted and coding not in refused)
+
+    if snapshot.br is not None and "br" in accepted:
+        return "br"
+    if _ok("gzip"):
+        return "gzip"
+    return None
+
+
+def snapshot_response(request: Request, snapshot: Snapshot) -> Response:
+    encoding = _select_encoding(request.headers.get("accept-encoding", ""), snapshot)
+    body = {"br": snapshot.br, "gzip": snapshot.gzip}.get(encoding, snapshot.identity)
+
+    headers = {"ETag": snapshot.etag(encoding), "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,332 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import httpx
+
+
+logger = logging.getLogger("job-service.writer")
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# statuses and errors that mean the server never processed the request, so
+# even a plain INSERT can be resent without risking duplicate rows
+NOT_PROCESSED_STATUS = {408, 425, 429}
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+PAYLOAD_TOO_LARGE = 413
+PRUNE_PAGE_SIZE = 1000
+PRUNE_DELETE_CHUNK = 200
+
+
+class SupabaseWriteError(RuntimeError):
+    pass
+
+
+@dataclass
+class WriteStats:
+    rows: int = 0
+    batches: int = 0
+    retries: int = 0
+    splits: int = 0
+    duplicates: int = 0
+    pruned: int = 0
+    elapsed: float = 0.0
+    final_batch_size: int = 0
+
+
+class SupabaseBatchWriter:
+    """Concurrent PostgREST inserter.
+
+    Batches are sliced on demand so each one picks up the batch size learned
+    from the latencies of the batches before it. Requests share one pooled
+    ``httpx.AsyncClient`` and at most ``max_in_flight`` run at once.
+
+    Without an ``upsert_key`` batches are plain inserts, which are only
+    retried when the request provably never reached the server. With one (it
+    needs a unique index on that column) every batch is an upsert, so any
+    failed batch can be retried without duplicating rows.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        table: str,
+        *,
+        max_in_flight: int = 4,
+        batch_size: int = 50,
+        min_batch_size: int = 5,
+        max_batch_size: int = 1000,
+        target_latency: float = 1.0,
+        max_payload_bytes: int = 1_000_000,
+        max_retries: int = 4,
+        backoff_seconds: float = 0.5,
+        upsert_key: str | None = None,
+        timeout: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.endpoint = f"{base_url.rstrip('/')}/rest/v1/{table}"
+        self.api_key = api_key
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.upsert_key = upsert_key or None
+        self.timeout = timeout
+        self.transport = transport
+        self._batch_size = self._clamp(batch_size)
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    def _clamp(self, size: int) -> int:
+        return max(self.min_batch_size, min(self.max_batch_size, size))
+
+    def _headers(self) -> dict:
+        prefer = "return=minimal"
+        if self.upsert_key:
+            prefer = "resolution=merge-duplicates," + prefer
+        return {
+            "apikey": self.api_key,
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Prefer": prefer,
+        }
+
+    def _client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_in_flight,
+            max_keepalive_connections=self.max_in_flight,
+        )
+        return httpx.AsyncClient(
+            headers=self._headers(),
+            limits=limits,
+            timeout=self.timeout,
+            transport=self.transport,
+        )
+
+    def _params(self) -> dict:
+        return {"on_conflict": self.upsert_key} if self.upsert_key else {}
+
+    def _dedupe(self, records: Sequence[dict]) -> List[dict]:
+        # an upsert batch may not touch the same key twice; keep the last one
+        if not self.upsert_key:
+            return list(records)
+        unique: dict = {}
+        for record in records:
+            unique[record.get(self.upsert_key)] = record
+        return list(unique.values())
+
+    def _observe(self, size: int, latency: float) -> None:
+        # steer towards target_latency, moving at most 2x per batch
+        ratio = self.target_latency / max(latency, 1e-3)
+        ratio = max(0.5, min(2.0, ratio))
+        self._batch_size = self._clamp(int((self._batch_size + size * ratio) / 2))
+
+    def _next_batch(self, encoded: List[bytes], start: int) -> int:
+        end = start
+        payload = 2
+        while end < len(encoded) and end - start < self._batch_size:
+            payload += len(encoded[end]) + 1
+            if payload > self.max_payload_bytes and end > start:
+                break
+            end += 1
+        return end
+
+    async def _request(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        stats: WriteStats,
+        *,
+        params: dict | None = None,
+        content: bytes | None = None,
+        idempotent: bool = True,
+    ) -> tuple:
+        """Send one request, retrying transport errors and retryable statuses.
+
+        A non-idempotent request is only retried when the server cannot have
+        applied it: the connection was never made or it answered 408/425/429.
+        Returns the final non-retryable response and the latency of that attempt.
+        """
+        retryable_status = RETRYABLE_STATUS if idempotent else NOT_PROCESSED_STATUS
+        retryable_errors = httpx.TransportError if idempotent else NOT_SENT_ERRORS
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    method, self.endpoint, params=params, content=content
+                )
+            except retryable_errors as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            except httpx.HTTPError as exc:
+                raise SupabaseWriteError(
+                    f"{method} {self.endpoint} failed: {type(exc).__name__}: {exc}"
+                ) from exc
+            else:
+                if response.status_code not in retryable_status:
+                    return response, time.perf_counter() - start
+                error = f"HTTP {response.status_code}"
+            if attempt == self.max_retries:
+                raise SupabaseWriteError(
+                    f"{method} failed after {attempt + 1} attempts: {error}"
+                )
+            stats.retries += 1
+            delay = self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+            logger.warning(
+                "%s failed (%s); retry %s/%s in %.2fs",
+                method, error, attempt + 1, self.max_retries, delay,
+            )
+            await asyncio.sleep(delay)
+
+    async def _post(
+        self, client: httpx.AsyncClient, batch: List[bytes], stats: WriteStats
+    ) -> None:
+        body = b"[" + b",".join(batch) + b"]"
+        response, latency = await self._request(
+            client,
+            "POST",
+            stats,
+            params=self._params(),
+            content=body,
+            idempotent=self.upsert_key is not None,
+        )
+        if response.status_code < 300:
+            self._observe(len(batch), latency)
+            stats.rows += len(batch)
+            stats.batches += 1
+            return
+        if response.status_code == PAYLOAD_TOO_LARGE and len(batch) > 1:
+            self.max_payload_bytes = min(self.max_payload_bytes, len(body) // 2)
+            self._batch_size = self._clamp(len(batch) // 2)
+            stats.splits += 1
+            logger.warning(
+                "Batch of %s rows (%s bytes) too large; splitting", len(batch), len(body)
+            )
+            middle = len(batch) // 2
+            await self._post(client, batch[:middle], stats)
+            await self._post(client, batch[middle:], stats)
+            return
+        raise SupabaseWriteError(
+            f"Insert of {len(batch)} rows rejected with {response.status_code}: "
+            f"{response.text[:200]}"
+        )
+
+    async def _write(
+        self, client: httpx.AsyncClient, records: List[dict], stats: WriteStats
+    ) -> None:
+        encoded = [json.dumps(record, separators=(",", ":")).encode("utf-8") for record in records]
+        slots = asyncio.Semaphore(self.max_in_flight)
+
+        async def _send(batch: List[bytes]) -> None:
+            try:
+                await self._post(client, batch, stats)
+            finally:
+                slots.release()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                start = 0
+                while start < len(encoded):
+                    await slots.acquire()
+                    end = self._next_batch(encoded, start)
+                    group.create_task(_send(encoded[start:end]))
+                    start = end
+        except* Exception as failures:
+            first = failures.exceptions[0]
+            if isinstance(first, SupabaseWriteError):
+                raise first from None
+            raise SupabaseWriteError(f"{type(first).__name__}: {first}") from first
+
+    async def _list_rows(self, client: httpx.AsyncClient, select: str, stats: WriteStats) -> List[dict]:
+        rows: List[dict] = []
+        offset = 0
+        while True:
+            params = {
+                "select": select,
+                "order": "id",
+                "limit": str(PRUNE_PAGE_SIZE),
+                "offset": str(offset),
+            }
+            response, _ = await self._request(client, "GET", stats, params=params)
+            if response.status_code >= 300:
+                raise SupabaseWriteError(
+                    f"Listing rows failed with {response.status_code}: {response.text[:200]}"
+                )
+            page = response.json()
+            rows.extend(page)
+            if len(page) < PRUNE_PAGE_SIZE:
+                return rows
+            offset += PRUNE_PAGE_SIZE
+
+    async def _delete_ids(self, client: httpx.AsyncClient, ids: List[int], stats: WriteStats) -> int:
+        # delete by id in chunks, so the URL never has to hold every kept key
+        for start in range(0, len(ids), PRUNE_DELETE_CHUNK):
+            chunk = ids[start:start + PRUNE_DELETE_CHUNK]
+            params = {"id": "in.(" + ",".join(str(row_id) for row_id in chunk) + ")"}
+            response, _ = await self._request(client, "DELETE", stats, params=params)
+            if response.status_code >= 300:
+                raise SupabaseWriteError(
+                    f"Deleting rows failed with {response.status_code}: {response.text[:200]}"
+                )
+        return len(ids)
+
+    def _finish(self, stats: WriteStats, started: float) -> WriteStats:
+        stats.elapsed = time.perf_counter() - started
+        stats.final_batch_size = self._batch_size
+        logger.info(
+            "Wrote %s rows in %s batches | %s duplicates dropped | %s pruned | %s retries | "
+            "%s splits | %.2fs | batch size now %s",
+            stats.rows, stats.batches, stats.duplicates, stats.pruned, stats.retries,
+            stats.splits, stats.elapsed, stats.final_batch_size,
+        )
+        return stats
+
+    async def write(self, records: Sequence[dict]) -> WriteStats:
+        stats = WriteStats()
+        started = time.perf_counter()
+        unique = self._dedupe(records)
+        stats.duplicates = len(records) - len(unique)
+        async with self._client() as client:
+            await self._write(client, unique, stats)
+        return self._finish(stats, started)
+
+    async def replace(self, records: Sequence[dict]) -> WriteStats:
+        """Make the table hold exactly ``records`` without ever emptying it.
+
+        With an ``upsert_key`` the rows are upserted and then rows whose key is
+        missing from ``records`` are deleted. Without one, the ids already in the
+        table are noted, the rows are inserted, and then those old ids are
+        deleted; if the insert fails, rows added since the snapshot are deleted
+        again so the previous run's rows are left as they were.
+        """
+        stats = WriteStats()
+        started = time.perf_counter()
+        unique = self._dedupe(records)
+        stats.duplicates = len(records) - len(unique)
+        async with self._client() as client:
+            if self.upsert_key:
+                await self._write(client, unique, stats)
+                keep = {record.get(self.upsert_key) for record in unique}
+                rows = await self._list_rows(client, f"id,{self.upsert_key}", stats)
+                stale = [row["id"] for row in rows if row.get(self.upsert_key) not in keep]
+            else:
+                old_ids = {row["id"] for row in await self._list_rows(client, "id", stats)}
+                try:
+                    await self._write(client, unique, stats)
+                except SupabaseWriteError:
+                    rows = await self._list_rows(client, "id", stats)
+                    added = [row["id"] for row in rows if row["id"] not in old_ids]
+                    logger.warning("Insert failed; rolling back %s new rows", len(added))
+                    await self._delete_ids(client, added, stats)
+                    raise
+                stale = sorted(old_ids)
+            stats.pruned = await self._delete_ids(client, stale, stats)
+        return self._finish(stats, started)
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from change_feed import ChangeFeed, StaleCursorError, WebhookRegistry, webhook_allowed
+
+
+def test_records_added_updated_removed(tmp_path):
+    feed = ChangeFeed(tmp_path / "changes.jsonl")
+    feed.record_run([{"redirect_link": "a", "v": 1}, {"redirect_link": "b", "v": 1}])
+    entries = feed.record_run([{"redirect_link": "a", "v": 2}])
+
+    assert [(entry["op"], entry["key"]) for entry in entries] == [("updated", "a"), ("removed", "b")]
+    assert feed.since(2, epoch=feed.epoch)["changes"] == entries
+
+
+def test_cursor_ahead_of_log_is_rejected(tmp_path):
+    feed = ChangeFeed(tmp_path / "changes.jsonl")
+    feed.record_run([{"redirect_link": "a"}])
+
+    with pytest.raises(StaleCursorError):
+        feed.since(5, epoch=feed.epoch)
+
+
+def test_cursor_from_reset_log_is_rejected(tmp_path):
+    path = tmp_path / "changes.jsonl"
+    old = ChangeFeed(path)
+    old.record_run([{"redirect_link": "a"}, {"redirect_link": "b"}])
+    path.unlink()
+
+    new = ChangeFeed(path)
+    new.record_run([{"redirect_link": key} for key in "cdef"])
+
+    assert new.epoch != old.epoch
+    with pytest.raises(StaleCursorError):
+        new.since(2, epoch=old.epoch)
+    with pytest.raises(StaleCursorError):
+        new.since(2)
+    assert new.since(0)["epoch"] == new.epoch
+
+
+def test_epoch_survives_restart(tmp_path):
+    path = tmp_path / "changes.jsonl"
+    feed = ChangeFeed(path)
+    feed.record_run([{"redirect_link": "a"}])
+
+    reloaded = ChangeFeed(path)
+    assert reloaded.epoch == feed.epoch
+    assert reloaded.since(0, epoch=feed.epoch)["cursor"] == 1
+
+
+def test_legacy_log_gets_an_epoch(tmp_path):
+    path = tmp_path / "changes.jsonl"
+    entry = {"cursor": 1, "op": "added", "key": "a", "record": {"redirect_link": "a"}, "changed_at": "t"}
+    path.write_text(json.dumps(entry) + "\n", encoding="utf-8")
+
+    feed = ChangeFeed(path)
+    assert feed.epoch
+    assert ChangeFeed(path).epoch == feed.epoch
+    assert ChangeFeed(path).cursor == 1
+
+
+def test_partial_last_line_is_truncated(tmp_path):
+    path = tmp_path / "changes.jsonl"
+    ChangeFeed(path).record_run([{"redirect_link": "a"}])
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write('{"cursor": 2, "op"')
+
+    feed = ChangeFeed(path)
+    feed.record_run([{"redirect_link": "a"}, {"redirect_link": "b"}])
+
+    assert ChangeFeed(path).cursor == 2
+
+
+def test_line_without_newline_is_partial_even_if_valid(tmp_path):
+    path = tmp_path / "changes.jsonl"
+    ChangeFeed(path).record_run([{"redirect_link": "a"}, {"redirect_link": "b"}])
+    entry = {"cursor": 3, "op": "added", "key": "c", "record": {"redirect_link": "c"}, "changed_at": "t"}
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(entry))
+
+    feed = ChangeFeed(path)
+    assert feed.cursor == 2
+    feed.record_run([{"redirect_link": key} for key in "abd"])
+
+    assert ChangeFeed(path).cursor == 3
+
+
+def test_webhooks_limited_to_local_or_allowed_hosts(tmp_path):
+    assert webhook_allowed("http://127.0.0.1:9000/hook")
+    assert webhook_allowed("http://localhost/hook")
+    assert not webhook_allowed("http://169.254.169.254/latest")
+    assert webhook_allowed("https://hooks.internal/x", ["hooks.internal"])
+
+    registry = WebhookRegistry(tmp_path / "webhooks.json")
+    with pytest.raises(ValueError):
+        registry.register("https://example.com/hook")
+    registry.register("http://localhost:9000/hook")
+    assert WebhookRegistry(tmp_path / "webhooks.json").urls() == ["http://localhost:9000/hook"]
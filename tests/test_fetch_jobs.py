@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+import fetch_jobs
+
+
+class StubPage:
+    def __init__(self, hits, misses):
+        self.cache = {"hits": hits, "misses": misses}
+
+    def evaluate(self, script):
+        return self.cache
+
+
+@pytest.fixture
+def profile_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("BROWSER_PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(fetch_jobs, "page_metrics", {})
+    return tmp_path
+
+
+def collect(profile, page, elapsed):
+    fetch_jobs._collect_page_metrics(
+        profile, page, "firefox", elapsed, fetch_jobs.unstop_logger, profile
+    )
+    return fetch_jobs.page_metrics[profile]
+
+
+def test_clear_one_source(profile_root):
+    (profile_root / "unstop" / "firefox").mkdir(parents=True)
+    (profile_root / "naukri" / "firefox").mkdir(parents=True)
+
+    assert fetch_jobs.clear_browser_profiles("unstop") == ["unstop"]
+    assert not (profile_root / "unstop").exists()
+    assert (profile_root / "naukri").exists()
+
+
+def test_clear_all_sources(profile_root):
+    for source in ("unstop", "naukri"):
+        (profile_root / source).mkdir()
+
+    assert sorted(fetch_jobs.clear_browser_profiles()) == ["naukri", "unstop"]
+    assert list(profile_root.iterdir()) == []
+
+
+def test_clear_without_profile_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv("BROWSER_PROFILE_DIR", raising=False)
+    assert fetch_jobs.clear_browser_profiles() == []
+
+    monkeypatch.setenv("BROWSER_PROFILE_DIR", str(tmp_path / "missing"))
+    assert fetch_jobs.clear_browser_profiles("unstop") == []
+
+
+def test_clear_failure_is_not_reported_as_cleared(profile_root, monkeypatch):
+    (profile_root / "unstop").mkdir()
+
+    def locked(path):
+        raise PermissionError(f"{path} is in use")
+
+    monkeypatch.setattr(fetch_jobs.shutil, "rmtree", locked)
+    with pytest.raises(OSError):
+        fetch_jobs.clear_browser_profiles("unstop")
+
+
+def test_metrics_ratio_and_previous_time(profile_root):
+    (profile_root / "unstop").mkdir()
+
+    first = collect("unstop", StubPage(hits=0, misses=4), 5.0)
+    assert first["cache_hit_ratio"] == 0
+    assert first["previous_time_to_ready"] is None
+
+    fetch_jobs.page_metrics.clear()  # the previous value now has to come from metrics.json
+    second = collect("unstop", StubPage(hits=3, misses=1), 3.5)
+    assert second["cache_hit_ratio"] == 0.75
+    assert second["previous_time_to_ready"] == 5.0
+    assert second["time_to_ready_saved"] == 1.5
+    assert json.loads((profile_root / "unstop" / "metrics.json").read_text()) == second
+
+
+def test_metrics_without_resources(profile_root):
+    (profile_root / "unstop").mkdir()
+    assert collect("unstop", StubPage(hits=0, misses=0), 1.0)["cache_hit_ratio"] is None
+
+
+def test_corrupt_metrics_file_is_ignored(profile_root):
+    (profile_root / "unstop").mkdir()
+    (profile_root / "unstop" / "metrics.json").write_text('{"time_to_re', encoding="utf-8")
+
+    metrics = collect("unstop", StubPage(hits=1, misses=1), 2.0)
+
+    assert metrics["previous_time_to_ready"] is None
+    assert json.loads((profile_root / "unstop" / "metrics.json").read_text())["time_to_ready"] == 2.0
@@ -0,0 +1,29 @@
+import skill_index
+from skill_index import SkillIndex
+
+
+RECORDS = [
+    {"title": "Backend Developer Intern", "qualifications": ["Python", "Django", "SQL"]},
+    {"title": "Frontend Intern", "qualifications": ["React", "CSS"]},
+    {"title": "Data Science Intern", "qualifications": ["Python", "Machine Learning"]},
+    {"title": "Android Developer", "qualifications": ["Kotlin"]},
+]
+
+
+def test_rank_orders_best_match_first():
+    results = SkillIndex(RECORDS).rank([["python", "machine learning"], ["React"], ["cobol"]], top_k=2)
+
+    assert [row for row, _ in results[0]] == [2, 0]
+    assert results[0][0][1] > results[0][1][1]
+    assert [row for row, _ in results[1]] == [1]
+    assert results[2] == []
+
+
+def test_chunked_ranking_matches_single_chunk(monkeypatch):
+    index = SkillIndex(RECORDS)
+    profiles = [["python"], ["react", "css"], ["kotlin"], ["sql", "django"]]
+    expected = index.rank(profiles, top_k=3)
+
+    # budget for one profile per chunk
+    monkeypatch.setattr(skill_index, "SCORE_BUDGET_BYTES", skill_index.SCORE_BYTES_PER_CELL * len(RECORDS))
+    assert index.rank(profiles, top_k=3) == expected
@@ -0,0 +1,85 @@
+import gzip
+import json
+from dataclasses import replace
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from snapshots import build_snapshot, snapshot_response
+
+
+PAYLOAD = [{"title": f"Job {idx}", "company": "Acme"} for idx in range(50)]
+
+
+@pytest.fixture
+def snapshot():
+    # fake brotli bytes so the br path is covered whether or not brotli is installed
+    return replace(build_snapshot(PAYLOAD), br=b"br-bytes")
+
+
+@pytest.fixture
+def client(snapshot):
+    app = FastAPI()
+
+    @app.get("/jobs")
+    async def jobs(request: Request):
+        return snapshot_response(request, snapshot)
+
+    return TestClient(app)
+
+
+def get(client, **headers):
+    # read raw bytes so the test client does not decode the body for us
+    with client.stream("GET", "/jobs", headers=headers) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize(
+    "accept, encoding",
+    [
+        ("gzip, br", "br"),
+        ("gzip", "gzip"),
+        ("identity", None),
+        ("*", "gzip"),
+        ("gzip;q=0, *", None),
+        ("gzip;q=0.5", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+    ],
+)
+def test_encoding_selection(client, snapshot, accept, encoding):
+    response, body = get(client, **{"Accept-Encoding": accept})
+
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == encoding
+    assert response.headers["etag"] == snapshot.etag(encoding)
+    assert body == {"br": snapshot.br, "gzip": snapshot.gzip, None: snapshot.identity}[encoding]
+
+
+def test_gzip_body_decodes_to_payload(client):
+    _, body = get(client, **{"Accept-Encoding": "gzip"})
+    assert json.loads(gzip.decompress(body)) == PAYLOAD
+
+
+def test_matching_etag_returns_304_with_same_etag(client):
+    first, _ = get(client, **{"Accept-Encoding": "gzip"})
+    response, body = get(client, **{"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == first.headers["etag"]
+    assert body == b""
+
+
+def test_weak_etag_matches(client):
+    first, _ = get(client, **{"Accept-Encoding": "identity"})
+    response, _ = get(client, **{"Accept-Encoding": "identity", "If-None-Match": "W/" + first.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_etag_of_other_encoding_does_not_match(client):
+    gzipped, _ = get(client, **{"Accept-Encoding": "gzip"})
+    response, body = get(client, **{"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["etag"]})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != gzipped.headers["etag"]
+    assert json.loads(body) == PAYLOAD
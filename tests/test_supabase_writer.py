@@ -0,0 +1,198 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from supabase_writer import SupabaseBatchWriter, SupabaseWriteError
+
+
+def make_records(count: int) -> list:
+    return [{"redirect_link": f"https://example.com/{idx}", "title": f"Job {idx}"} for idx in range(count)]
+
+
+class FakeTable:
+    """Minimal PostgREST table: insert/upsert, paged id listing, delete by id."""
+
+    def __init__(self, rows=(), fail_inserts_after=None):
+        self.rows = []
+        self.next_id = 1
+        self.inserts = 0
+        self.fail_inserts_after = fail_inserts_after
+        for row in rows:
+            self._store(dict(row), None)
+
+    def _store(self, row, conflict):
+        if conflict:
+            for existing in self.rows:
+                if existing[conflict] == row[conflict]:
+                    existing.update(row)
+                    return
+        self.rows.append({"id": self.next_id, **row})
+        self.next_id += 1
+
+    def __call__(self, request):
+        if request.method == "POST":
+            if self.fail_inserts_after is not None and self.inserts >= self.fail_inserts_after:
+                return httpx.Response(400, json={"message": "bad row"})
+            self.inserts += 1
+            for row in json.loads(request.content):
+                self._store(row, request.url.params.get("on_conflict"))
+            return httpx.Response(201)
+        if request.method == "GET":
+            offset = int(request.url.params["offset"])
+            limit = int(request.url.params["limit"])
+            return httpx.Response(200, json=self.rows[offset:offset + limit])
+        ids = {int(row_id) for row_id in request.url.params["id"][4:-1].split(",")}
+        self.rows = [row for row in self.rows if row["id"] not in ids]
+        return httpx.Response(204)
+
+
+def make_writer(handler, **kwargs) -> SupabaseBatchWriter:
+    kwargs.setdefault("batch_size", 10)
+    kwargs.setdefault("min_batch_size", 1)
+    return SupabaseBatchWriter(
+        "http://supabase.test",
+        "key",
+        "internships",
+        backoff_seconds=0,
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+def test_upsert_retries_503_then_succeeds():
+    calls = []
+
+    def handler(request):
+        calls.append(len(json.loads(request.content)))
+        return httpx.Response(503 if len(calls) == 1 else 201)
+
+    writer = make_writer(handler, max_in_flight=1, upsert_key="redirect_link")
+    stats = asyncio.run(writer.write(make_records(10)))
+
+    assert stats.rows == 10
+    assert stats.retries == 1
+    assert calls == [10, 10]
+
+
+def test_413_splits_batch():
+    sizes = []
+    bodies = []
+
+    def handler(request):
+        rows = json.loads(request.content)
+        sizes.append(len(rows))
+        bodies.append(len(request.content))
+        return httpx.Response(413 if len(rows) > 5 else 201)
+
+    writer = make_writer(handler, max_in_flight=1)
+    stats = asyncio.run(writer.write(make_records(10)))
+
+    assert stats.rows == 10
+    assert stats.splits == 1
+    assert sizes == [10, 5, 5]
+    # later batches are sliced under the payload size that was rejected
+    assert writer.max_payload_bytes < bodies[0]
+
+
+@pytest.mark.parametrize("failure", [httpx.Response(503), httpx.ReadTimeout("slow")])
+def test_plain_insert_not_retried_when_it_may_have_applied(failure):
+    stored = []
+
+    def handler(request):
+        stored.extend(json.loads(request.content))
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    with pytest.raises(SupabaseWriteError):
+        asyncio.run(make_writer(handler, max_in_flight=1).write(make_records(10)))
+    assert len(stored) == 10
+
+
+def test_plain_insert_retried_when_never_sent():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(201)
+
+    stats = asyncio.run(make_writer(handler, max_in_flight=1).write(make_records(10)))
+
+    assert stats.rows == 10
+    assert stats.retries == 1
+
+
+def test_400_aborts_without_retry():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"message": "no unique constraint"})
+
+    with pytest.raises(SupabaseWriteError, match="400"):
+        asyncio.run(make_writer(handler, max_in_flight=1).write(make_records(10)))
+    assert len(calls) == 1
+
+
+def test_unexpected_httpx_error_is_wrapped():
+    def handler(request):
+        raise httpx.DecodingError("bad payload")
+
+    with pytest.raises(SupabaseWriteError, match="bad payload"):
+        asyncio.run(make_writer(handler).write(make_records(3)))
+
+
+def test_batch_size_adapts_to_latency():
+    writer = make_writer(lambda request: httpx.Response(201), target_latency=1.0)
+    writer._observe(10, 0.1)
+    assert writer.batch_size > 10
+    grown = writer.batch_size
+    writer._observe(grown, 4.0)
+    assert writer.batch_size < grown
+
+
+def test_replace_inserts_then_deletes_previous_rows():
+    table = FakeTable(make_records(3))
+
+    stats = asyncio.run(make_writer(table).replace(make_records(2)))
+
+    assert stats.rows == 2
+    assert stats.pruned == 3
+    assert [row["id"] for row in table.rows] == [4, 5]
+
+
+def test_replace_rolls_back_failed_insert():
+    table = FakeTable(make_records(3), fail_inserts_after=1)
+
+    with pytest.raises(SupabaseWriteError):
+        asyncio.run(make_writer(table, max_in_flight=1, batch_size=5).replace(make_records(20)))
+
+    assert [row["id"] for row in table.rows] == [1, 2, 3]
+
+
+def test_replace_upserts_then_prunes_missing_rows():
+    deleted = []
+
+    def handler(request):
+        if request.method == "POST":
+            assert request.url.params["on_conflict"] == "redirect_link"
+            return httpx.Response(201)
+        if request.method == "GET":
+            return httpx.Response(200, json=[
+                {"id": 1, "redirect_link": "https://example.com/0"},
+                {"id": 2, "redirect_link": "https://example.com/stale"},
+            ])
+        deleted.append(request.url.params["id"])
+        return httpx.Response(204)
+
+    records = make_records(2) + make_records(1)
+    stats = asyncio.run(make_writer(handler, upsert_key="redirect_link").replace(records))
+
+    assert stats.rows == 2
+    assert stats.duplicates == 1
+    assert stats.pruned == 1
+    assert deleted == ["in.(2)"]